@@ -12,7 +12,7 @@ import os
 from datetime import datetime
 
 # Import our AI service
-from grant_service import find_and_evaluate_grants, find_and_evaluate_grants_streaming, embeddings
+from grant_service import find_and_evaluate_grants, find_and_evaluate_grants_streaming, embed_query, strip_code_fences
 from database import get_session, init_db
 from models import Grant, Organization
 from subscription_model import Subscription
@@ -102,6 +102,14 @@ app.add_middleware(
 )
 
 
+# Headers for Server-Sent Events responses (disable caching and proxy buffering)
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "X-Accel-Buffering": "no",
+}
+
+
 @app.on_event("startup")
 def on_startup():
     try:
@@ -145,8 +153,18 @@ async def list_grants(current_user: dict = Depends(get_current_user)):
     """List all available grants in the database"""
     try:
         with get_session() as session:
-            # Return all grants, sorted by is_open (open first)
-            statement = select(Grant).order_by(Grant.is_open.desc())
+            # Return all grants, sorted by is_open (open first).
+            # Only the listed columns are selected, so the 768-dim embeddings and
+            # full_text_context are never loaded or hydrated into Grant objects.
+            statement = select(
+                Grant.id,
+                Grant.name,
+                Grant.agency_name,
+                Grant.max_funding,
+                Grant.is_open,
+                Grant.original_url,
+                Grant.application_url,
+            ).order_by(Grant.is_open.desc())
             results = session.exec(statement).all()
             
             return [
@@ -180,10 +198,7 @@ async def search_grants(
         result = find_and_evaluate_grants_with_progress(req_dict)
         
         # Parse response
-        if "```json" in result:
-            result = result.split("```json")[1].split("```")[0].strip()
-        elif "```" in result:
-            result = result.split("```")[1].split("```")[0].strip()
+        result = strip_code_fences(result)
         
         grants_data = json.loads(result)
         
@@ -231,16 +246,7 @@ async def search_grants_stream(
             
             progress_counter = 10
             
-            # Generator function that will run in thread
-            def run_streaming_generator():
-                for update in find_and_evaluate_grants_streaming(req_dict):
-                    yield update
-            
-            # Process updates as they come
-            loop = asyncio.get_event_loop()
-            executor = loop.run_in_executor
-            
-            # We need a different approach - use a queue
+            # Run the search in a background thread and hand updates over via a queue
             import queue
             import threading
             
@@ -260,72 +266,64 @@ async def search_grants_stream(
             
             # Stream updates as they arrive
             while True:
-                try:
-                    # Non-blocking get with timeout
-                    update = update_queue.get(timeout=0.1)
+                # Wait for the next update in a worker thread so the event loop
+                # keeps serving other requests without polling
+                update = await asyncio.to_thread(update_queue.get)
+                
+                if update is None:
+                    break
+                
+                if update['type'] == 'error':
+                    error_response = {
+                        'type': 'error',
+                        'stage': 'error',
+                        'message': f'Search failed: {update["error"]}',
+                        'progress': 0
+                    }
+                    yield f"data: {json.dumps(error_response)}\n\n"
+                    break
+                
+                elif update['type'] == 'progress':
+                    progress_counter = min(progress_counter + 10, 90)
+                    data = update['data']
+                    response = {
+                        'type': 'progress',
+                        'stage': data.get('stage', 'processing'),
+                        'message': data.get('message', ''),
+                        'progress': progress_counter,
+                        'details': data.get('details', {})
+                    }
+                    yield f"data: {json.dumps(response)}\n\n"
                     
-                    if update is None:
-                        break
+                elif update['type'] == 'result':
+                    # Parse final result
+                    result = update['data']
                     
-                    if update['type'] == 'error':
-                        error_response = {
-                            'type': 'error',
-                            'stage': 'error',
-                            'message': f'Search failed: {update["error"]}',
-                            'progress': 0
-                        }
-                        yield f"data: {json.dumps(error_response)}\n\n"
-                        break
+                    # Handle case where result is already a Python object
+                    if isinstance(result, (list, dict)):
+                        grants_data = result
+                    else:
+                        # Result is a string, may need cleaning
+                        if isinstance(result, str):
+                            result = strip_code_fences(result)
+                        grants_data = json.loads(result)
                     
-                    elif update['type'] == 'progress':
-                        progress_counter = min(progress_counter + 10, 90)
-                        data = update['data']
-                        response = {
-                            'type': 'progress',
-                            'stage': data.get('stage', 'processing'),
-                            'message': data.get('message', ''),
-                            'progress': progress_counter,
-                            'details': data.get('details', {})
+                    # Final response
+                    response = {
+                        'type': 'complete',
+                        'stage': 'complete',
+                        'message': 'Search complete!',
+                        'progress': 100,
+                        'data': {
+                            'success': True,
+                            'grants': grants_data,
+                            'total_found': len(grants_data)
                         }
-                        yield f"data: {json.dumps(response)}\n\n"
-                        
-                    elif update['type'] == 'result':
-                        # Parse final result
-                        result = update['data']
-                        
-                        # Handle case where result is already a Python object
-                        if isinstance(result, (list, dict)):
-                            grants_data = result
-                        else:
-                            # Result is a string, may need cleaning
-                            if isinstance(result, str):
-                                if "```json" in result:
-                                    result = result.split("```json")[1].split("```")[0].strip()
-                                elif "```" in result:
-                                    result = result.split("```")[1].split("```")[0].strip()
-                            grants_data = json.loads(result)
-                        
-                        # Final response
-                        response = {
-                            'type': 'complete',
-                            'stage': 'complete',
-                            'message': 'Search complete!',
-                            'progress': 100,
-                            'data': {
-                                'success': True,
-                                'grants': grants_data,
-                                'total_found': len(grants_data)
-                            }
-                        }
-                        yield f"data: {json.dumps(response)}\n\n"
-                        
-                except queue.Empty:
-                    # No update available, just wait
-                    await asyncio.sleep(0.1)
-                    continue
+                    }
+                    yield f"data: {json.dumps(response)}\n\n"
             
-            # Wait for thread to complete
-            thread.join(timeout=60)
+            # Wait for thread to complete, off the event loop
+            await asyncio.to_thread(thread.join, 60)
             
         except Exception as e:
             error_response = {
@@ -339,11 +337,7 @@ async def search_grants_stream(
     return StreamingResponse(
         generate_progress(),
         media_type="text/event-stream",
-        headers={
-            "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
-            "X-Accel-Buffering": "no",
-        }
+        headers=SSE_HEADERS
     )
 
 
@@ -356,7 +350,7 @@ def upsert_subscription(session, sub_data: SubscriptionCreate) -> Subscription:
     """
     # Generate embedding for preferences
     preference_text = f"{sub_data.issue_area} {sub_data.scope_of_grant} {' '.join(sub_data.kpis)}"
-    preference_embedding = embeddings.embed_query(preference_text)
+    preference_embedding = list(embed_query(preference_text))
     
     # Check if email already subscribed
     existing = session.exec(
@@ -397,6 +391,14 @@ def upsert_subscription(session, sub_data: SubscriptionCreate) -> Subscription:
     return subscription
 
 
+def to_subscription_response(subscription: Subscription) -> SubscriptionResponse:
+    """
+    Builds the API response model from a Subscription row.
+    Validates straight from the row's attributes in one pydantic-core pass.
+    """
+    return SubscriptionResponse.model_validate(subscription, from_attributes=True)
+
+
 # ==========================================
 # ORGANIZATION ENDPOINTS
 # ==========================================
@@ -501,17 +503,7 @@ async def create_subscription(sub: SubscriptionCreate):
         with get_session() as session:
             subscription = upsert_subscription(session, sub)
             
-            return SubscriptionResponse(
-                id=subscription.id,
-                email=subscription.email,
-                organization_name=subscription.organization_name,
-                issue_area=subscription.issue_area,
-                scope_of_grant=subscription.scope_of_grant,
-                kpis=subscription.kpis,
-                funding_quantum=subscription.funding_quantum,
-                is_active=subscription.is_active,
-                created_at=subscription.created_at
-            )
+            return to_subscription_response(subscription)
             
     except Exception as e:
         print(f"[Subscribe Error] {e}")
@@ -532,20 +524,7 @@ async def get_subscriptions(email: str):
                 )
             ).all()
             
-            return [
-                SubscriptionResponse(
-                    id=s.id,
-                    email=s.email,
-                    organization_name=s.organization_name,
-                    issue_area=s.issue_area,
-                    scope_of_grant=s.scope_of_grant,
-                    kpis=s.kpis,
-                    funding_quantum=s.funding_quantum,
-                    is_active=s.is_active,
-                    created_at=s.created_at
-                )
-                for s in results
-            ]
+            return [to_subscription_response(s) for s in results]
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
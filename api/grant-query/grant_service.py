@@ -2,10 +2,9 @@
 grant_service.py - Simplified Grant Search & Evaluation (Gemini + AlloyDB)
 """
 import json
-import os
+from functools import lru_cache
 from typing import List, Dict, Generator
 
-from langchain_google_genai import ChatGoogleGenerativeAI, GoogleGenerativeAIEmbeddings
 from langchain_core.messages import HumanMessage
 from dotenv import load_dotenv
 from sqlalchemy import text
@@ -18,17 +17,37 @@ load_dotenv()
 # ==========================================
 # INITIALIZATION
 # ==========================================
-print("[System] Initializing Gemini & AlloyDB...", flush=True)
+# Lazy-initialized clients so importing this module (API startup, tooling) stays cheap.
+# langchain_google_genai is imported inside the getters for the same reason.
+_llm = None
+_embeddings = None
 
-llm = ChatGoogleGenerativeAI(
-    model="gemini-2.5-flash",
-    temperature=0.0,
-    timeout=120,
-)
+def get_llm():
+    global _llm
+    if _llm is None:
+        print("[System] Initializing Gemini LLM...", flush=True)
+        from langchain_google_genai import ChatGoogleGenerativeAI
+        _llm = ChatGoogleGenerativeAI(
+            model="gemini-2.5-flash",
+            temperature=0.0,
+            timeout=120,
+        )
+    return _llm
 
-embeddings = GoogleGenerativeAIEmbeddings(
-    model="models/text-embedding-004"
-)
+def get_embeddings():
+    global _embeddings
+    if _embeddings is None:
+        print("[System] Initializing Gemini embeddings...", flush=True)
+        from langchain_google_genai import GoogleGenerativeAIEmbeddings
+        _embeddings = GoogleGenerativeAIEmbeddings(
+            model="models/text-embedding-004"
+        )
+    return _embeddings
+
+@lru_cache(maxsize=256)
+def embed_query(text: str) -> tuple:
+    """Embed a query string; memoized because identical searches/preferences recur"""
+    return tuple(get_embeddings().embed_query(text))
 
 # Progress callback
 _progress_callback = None
@@ -41,29 +60,38 @@ def emit_progress(stage: str, message: str, details: dict = None):
     if _progress_callback:
         _progress_callback({"stage": stage, "message": message, "details": details or {}})
 
+def strip_code_fences(content: str) -> str:
+    """Returns the body of the first ```json (or bare ```) block, or content unchanged if unfenced"""
+    for fence in ("```json", "```"):
+        if fence in content:
+            # partition stops at the first match instead of splitting the whole string
+            return content.partition(fence)[2].partition("```")[0].strip()
+    return content
+
 # ==========================================
 # CORE FUNCTIONS
 # ==========================================
+# Static query, compiled once rather than on every search
+SEARCH_GRANTS_SQL = text("""
+    SELECT id, name, agency_name, full_text_context, max_funding, application_url, deadline, original_url
+    FROM grants
+    WHERE is_open = TRUE
+    ORDER BY embedding <=> CAST(:vector AS vector)
+    LIMIT :limit
+""")
+
 def search_grants(query: str, limit: int = 5) -> List[Dict]:
     """Vector search for grants in AlloyDB"""
     print(f"[Search] Query: '{query}'", flush=True)
     emit_progress("searching", f"🔍 Searching database for: '{query}'")
     
     try:
-        query_vector = embeddings.embed_query(query)
+        query_vector = embed_query(query)
         print(f"[Search] Embedded into {len(query_vector)} dimensions", flush=True)
         
         with get_session() as session:
-            sql = text("""
-                SELECT id, name, agency_name, full_text_context, max_funding, application_url, deadline, original_url
-                FROM grants
-                WHERE is_open = TRUE
-                ORDER BY embedding <=> CAST(:vector AS vector)
-                LIMIT :limit
-            """)
-            
             vector_str = f"[{','.join(map(str, query_vector))}]"
-            results = session.execute(sql, {"vector": vector_str, "limit": limit}).fetchall()
+            results = session.execute(SEARCH_GRANTS_SQL, {"vector": vector_str, "limit": limit}).fetchall()
             
             print(f"[Search] Found {len(results)} potential grants", flush=True)
             emit_progress("searching", f"✓ Checking {len(results)} potential grants...")
@@ -100,9 +128,7 @@ def evaluate_grants(grants: List[Dict], requirements: dict) -> List[Dict]:
     print(f"[Evaluate] Evaluating {len(grants)} grants", flush=True)
     
     # Build grants summary for Gemini
-    grants_text = ""
-    for i, g in enumerate(grants):
-        grants_text += f"""
+    grants_text = "".join(f"""
 Grant {i+1}:
 - ID: {g['id']}
 - Name: {g['name']}
@@ -110,7 +136,7 @@ Grant {i+1}:
 - Max Funding: ${g['max_funding'] or 'Unknown'}
 - Description: {g['description'][:300]}...
 ---
-"""
+""" for i, g in enumerate(grants))
     
     prompt = f"""You are a grant matching expert. Evaluate these grants for the user's project.
 
@@ -147,7 +173,7 @@ IMPORTANT:
 """
 
     try:
-        response = llm.invoke([HumanMessage(content=prompt)])
+        response = get_llm().invoke([HumanMessage(content=prompt)])
         
         # Handle response.content being either string or list
         raw_content = response.content
@@ -171,10 +197,7 @@ IMPORTANT:
             raise ValueError("Empty response from LLM")
         
         # Clean markdown if present
-        if "```json" in content:
-            content = content.split("```json")[1].split("```")[0].strip()
-        elif "```" in content:
-            content = content.split("```")[1].split("```")[0].strip()
+        content = strip_code_fences(content)
         
         evaluated = json.loads(content)
         print(f"[Evaluate] AI returned {len(evaluated)} matching grants", flush=True)
@@ -183,16 +206,15 @@ IMPORTANT:
 
         
         # Merge application_url, original_url and deadline from original grants into evaluated results
-        grant_app_urls = {g["id"]: g.get("application_url") for g in grants}
-        grant_original_urls = {g["id"]: g.get("original_url") for g in grants}
-        grant_deadlines = {g["id"]: g.get("deadline", "Open") for g in grants}
+        grants_by_id = {g["id"]: g for g in grants}
         for item in evaluated:
             gid = item.get("grant_id")
             if gid:
-                item["application_url"] = grant_app_urls.get(gid)
-                item["original_url"] = grant_original_urls.get(gid)
-                item["details_url"] = grant_original_urls.get(gid)  # Details = info page
-                item["deadline"] = grant_deadlines.get(gid, "Open")
+                grant = grants_by_id.get(gid, {})
+                item["application_url"] = grant.get("application_url")
+                item["original_url"] = grant.get("original_url")
+                item["details_url"] = grant.get("original_url")  # Details = info page
+                item["deadline"] = grant.get("deadline", "Open")
         
         return evaluated
 
@@ -226,8 +248,8 @@ IMPORTANT:
 # ==========================================
 # PUBLIC API
 # ==========================================
-def find_and_evaluate_grants(project_requirements: dict) -> str:
-    """Main entry point - returns JSON string"""
+def find_top_grants(project_requirements: dict) -> list:
+    """Search and evaluate grants, returning the top 3 as Python objects"""
     print("\n" + "="*60, flush=True)
     print("GRANT SEARCH - START", flush=True)
     print("="*60, flush=True)
@@ -244,7 +266,7 @@ def find_and_evaluate_grants(project_requirements: dict) -> str:
     
     if not grants:
         emit_progress("complete", "No grants found")
-        return "[]"
+        return []
     
     # 3. Evaluate with Gemini
     evaluated = evaluate_grants(grants, project_requirements)
@@ -258,7 +280,11 @@ def find_and_evaluate_grants(project_requirements: dict) -> str:
     print("GRANT SEARCH - COMPLETE", flush=True)
     print("="*60, flush=True)
     
-    return json.dumps(evaluated[:3])  # Return top 3
+    return evaluated[:3]  # Return top 3
+
+def find_and_evaluate_grants(project_requirements: dict) -> str:
+    """Main entry point - returns JSON string"""
+    return json.dumps(find_top_grants(project_requirements))
 
 def find_and_evaluate_grants_streaming(project_requirements: dict) -> Generator[dict, None, None]:
     """Streaming version with progress updates"""
@@ -277,7 +303,8 @@ def find_and_evaluate_grants_streaming(project_requirements: dict) -> Generator[
     
     def run_search():
         try:
-            result = find_and_evaluate_grants(project_requirements)
+            # Hand the list over as-is; the API serializes the final SSE frame itself
+            result = find_top_grants(project_requirements)
             progress_queue.put({"type": "result", "data": result})
         except Exception as e:
             progress_queue.put({"type": "error", "data": str(e)})
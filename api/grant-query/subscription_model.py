@@ -29,7 +29,7 @@ class Subscription(SQLModel, table=True):
     scope_of_grant: str = Field(description="Detailed scope and objectives")
     kpis: List[str] = Field(
         sa_column=Column(JSONB), 
-        default=[],
+        default_factory=list,
         description="Key Performance Indicators"
     )
     funding_quantum: float = Field(description="Desired funding amount")
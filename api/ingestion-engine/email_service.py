@@ -5,25 +5,31 @@ import os
 from typing import List, Dict, Any
 from datetime import datetime
 
+FROM_EMAIL = "GrantRadarSG <hello@grantradarsg2026.site>"
+
+# Resend is configured once, on first use, and reused for every notification
+_resend = None
+
 
 def get_resend_client():
     """Get configured Resend client"""
-    try:
-        import resend
+    global _resend
+    if _resend is None:
+        try:
+            import resend
+        except ImportError:
+            print("[Email] Resend package not installed")
+            return None
         resend.api_key = os.environ.get("RESEND_API_KEY")
-        return resend
-    except ImportError:
-        print("[Email] Resend package not installed")
-        return None
+        _resend = resend
+    return _resend
 
 
 def render_grant_email(org_name: str, grants: List[Dict[str, Any]]) -> str:
     """
     Render HTML email template for grant notifications.
     """
-    grants_html = ""
-    for grant in grants:
-        grants_html += f"""
+    grants_html = "".join(f"""
         <div style="background: #f8fafc; border-radius: 12px; padding: 20px; margin-bottom: 16px; border-left: 4px solid #6366f1;">
             <h3 style="margin: 0 0 8px 0; color: #1e293b; font-size: 18px;">{grant.get('name', 'Unnamed Grant')}</h3>
             <p style="margin: 0 0 8px 0; color: #64748b; font-size: 14px;">
@@ -41,7 +47,7 @@ def render_grant_email(org_name: str, grants: List[Dict[str, Any]]) -> str:
                 View Grant →
             </a>
         </div>
-        """
+        """ for grant in grants)
     
     html = f"""
     <!DOCTYPE html>
@@ -104,7 +110,7 @@ def send_grant_notification(
     email: str, 
     org_name: str, 
     grants: List[Dict[str, Any]],
-    from_email: str = "GrantRadarSG <hello@grantradarsg2026.site>"
+    from_email: str = FROM_EMAIL
 ) -> bool:
     """
     Send email notification about new matching grants.
@@ -153,7 +159,7 @@ def send_test_email(email: str) -> bool:
     
     try:
         result = resend.Emails.send({
-            "from": "GrantRadarSG <hello@grantradarsg2026.site>",
+            "from": FROM_EMAIL,
             "to": email,
             "subject": "✅ GrantRadarSG - Email Notifications Activated!",
             "html": """
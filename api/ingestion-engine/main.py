@@ -5,12 +5,12 @@ import json
 import os
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
-from services.ingestor import ingest_grant
+from services.ingestor import ingest_grant, create_http_client, MAX_CONCURRENT_INGESTS
 from database import init_db, get_session
 from models import Grant
 from subscription_model import Subscription
 from email_service import send_grant_notification
-from sqlalchemy import text
+from sqlalchemy import text, values, column, String, Boolean
 
 # Load environment variables
 load_dotenv()
@@ -18,6 +18,24 @@ load_dotenv()
 # Initialize Firebase Admin
 initialize_app()
 
+SOURCE_API = "https://oursggrants.gov.sg/api/v1/grant_metadata/explore_grants"
+
+# Used by extract_deadline to recognise date-like closing_dates values
+MONTH_ABBREVIATIONS = ("jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec")
+
+# Subscriptions whose preference embedding is close to a grant's embedding
+MATCH_SUBSCRIPTIONS_SQL = text("""
+    SELECT s.id, s.email, s.organization_name,
+           1 - (s.preference_embedding <=> g.embedding) as similarity
+    FROM subscriptions s
+    CROSS JOIN grants g
+    WHERE s.is_active = TRUE 
+      AND g.id = :grant_id
+      AND s.preference_embedding IS NOT NULL
+      AND (1 - (s.preference_embedding <=> g.embedding)) > 0.5
+    ORDER BY similarity DESC
+""")
+
 # Global flag for lazy initialization (avoids DB connect during deploy verification)
 _db_initialized = False
 
@@ -36,45 +54,37 @@ async def send_notifications_for_grant(grant_id: str):
             return
         
         # Find matching subscriptions using vector similarity
-        sql = text("""
-            SELECT s.id, s.email, s.organization_name,
-                   1 - (s.preference_embedding <=> g.embedding) as similarity
-            FROM subscriptions s
-            CROSS JOIN grants g
-            WHERE s.is_active = TRUE 
-              AND g.id = :grant_id
-              AND s.preference_embedding IS NOT NULL
-              AND (1 - (s.preference_embedding <=> g.embedding)) > 0.5
-            ORDER BY similarity DESC
-        """)
-        
-        matches = session.execute(sql, {"grant_id": grant_id}).fetchall()
+        matches = session.execute(MATCH_SUBSCRIPTIONS_SQL, {"grant_id": grant_id}).fetchall()
         print(f"[Notify] Found {len(matches)} matching subscriptions", flush=True)
         
+        # Same grant payload for every subscriber
+        grants = [{
+            "name": grant.name,
+            "agency_name": grant.agency_name,
+            "max_funding": grant.max_funding,
+            "strategic_intent": grant.strategic_intent,
+            "original_url": grant.original_url
+        }]
+        
         # Send emails to matching subscribers
         emails_sent = 0
+        notified_ids = []
         for match in matches:
             sub_id, email, org_name, similarity = match
             
             print(f"[Notify] Sending to {email} (similarity: {similarity:.2f})", flush=True)
             
-            grant_data = {
-                "name": grant.name,
-                "agency_name": grant.agency_name,
-                "max_funding": grant.max_funding,
-                "strategic_intent": grant.strategic_intent,
-                "original_url": grant.original_url
-            }
-            
-            if send_grant_notification(email, org_name, [grant_data]):
+            if send_grant_notification(email, org_name, grants):
                 emails_sent += 1
-                
-                # Update last_notified_at
-                sub = session.get(Subscription, sub_id)
-                if sub:
-                    sub.last_notified_at = datetime.utcnow()
-                    session.add(sub)
+                notified_ids.append(sub_id)
         
+        # Update last_notified_at for every notified subscriber in one statement
+        if notified_ids:
+            session.exec(
+                Subscription.__table__.update()
+                .where(Subscription.id.in_(notified_ids))
+                .values(last_notified_at=datetime.utcnow())
+            )
         session.commit()
         print(f"[Notify] Sent {emails_sent} emails for grant {grant_id}", flush=True)
 
@@ -112,7 +122,7 @@ def extract_deadline(closing_dates):
         return "Open"
     
     # Look for actual date values (not "Open for Applications" or "Applications closed")
-    for key in ['organisation', 'individual']:
+    for key in ('organisation', 'individual'):
         value = closing_dates.get(key, "")
         if value and isinstance(value, str):
             val_lower = value.lower()
@@ -121,7 +131,7 @@ def extract_deadline(closing_dates):
             if "closed" in val_lower:
                 return "Closed"
             # If it looks like a date, return it
-            if any(month in val_lower for month in ['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec']):
+            if any(month in val_lower for month in MONTH_ABBREVIATIONS):
                 return value
             # Check for numeric date patterns
             if any(c.isdigit() for c in value):
@@ -149,6 +159,39 @@ def is_recently_updated(updated_at_str, days=14):
         return True  # Parse error = assume needs processing
 
 
+async def process_new_grants(grants_to_process, start_log, notify_error_log):
+    """
+    Ingest new grants concurrently and notify subscribers for each success.
+    start_log / notify_error_log are the caller's log templates, so each trigger
+    keeps its own log lines. Returns one success flag per grant.
+    """
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_INGESTS)
+    
+    async def protected_ingest(grant, http_client):
+        async with semaphore:
+            slug = grant.get("slug")
+            url = grant.get("url")
+            gid = grant.get("id")
+            
+            if slug and gid:
+                print(start_log.format(gid=gid, slug=slug), flush=True)
+                success = await ingest_grant(gid, slug, url, http_client)
+                
+                # Send email notifications for new grant directly
+                if success:
+                    try:
+                        await send_notifications_for_grant(gid)
+                    except Exception as e:
+                        print(notify_error_log.format(error=e), flush=True)
+                
+                return success
+            return False
+
+    # One HTTP client for the whole batch so connections are reused across grants
+    async with create_http_client() as http_client:
+        return await asyncio.gather(*[protected_ingest(g, http_client) for g in grants_to_process])
+
+
 @https_fn.on_request(
     timeout_sec=540, 
     memory=options.MemoryOption.GB_2,
@@ -179,7 +222,6 @@ def trigger_ingestion(req: https_fn.Request) -> https_fn.Response:
             return https_fn.Response(f"Database unavailable: {e}", status=500)
 
     # 1. Fetch from Source API
-    SOURCE_API = "https://oursggrants.gov.sg/api/v1/grant_metadata/explore_grants"
     print(f"[System] Fetching grants from {SOURCE_API}...", flush=True)
     
     try:
@@ -241,11 +283,19 @@ def trigger_ingestion(req: https_fn.Request) -> https_fn.Response:
     updated_count = 0
     try:
         with get_session() as session:
-            for g in grants_to_update_status:
+            if grants_to_update_status:
+                # One UPDATE ... FROM (VALUES ...) instead of a round trip per grant
+                status_rows = values(
+                    column("id", String),
+                    column("is_open", Boolean),
+                    column("deadline", String),
+                    name="status_rows",
+                ).data([(g["id"], g["is_open"], g["deadline"]) for g in grants_to_update_status])
+                grants_table = Grant.__table__
                 stmt = (
-                    Grant.__table__.update()
-                    .where(Grant.id == g["id"])
-                    .values(is_open=g["is_open"], deadline=g["deadline"])
+                    grants_table.update()
+                    .where(grants_table.c.id == status_rows.c.id)
+                    .values(is_open=status_rows.c.is_open, deadline=status_rows.c.deadline)
                 )
                 session.exec(stmt)
             session.commit()
@@ -263,33 +313,11 @@ def trigger_ingestion(req: https_fn.Request) -> https_fn.Response:
             "message": "No new grants to process"
         }), status=200)
 
-    async def process_batch():
-        semaphore = asyncio.Semaphore(10)
-        
-        async def protected_ingest(grant):
-            async with semaphore:
-                slug = grant.get("slug")
-                url = grant.get("url")
-                gid = grant.get("id")
-                
-                if slug and gid:
-                    print(f"[Core] Starting ingest for {gid} ({slug})...", flush=True)
-                    success = await ingest_grant(gid, slug, url)
-                    
-                    # Send email notifications for new grant directly
-                    if success:
-                        try:
-                            await send_notifications_for_grant(gid)
-                        except Exception as e:
-                            print(f"[Notify] Failed to send notifications: {e}", flush=True)
-                    
-                    return success
-                return False
-
-        results = await asyncio.gather(*[protected_ingest(g) for g in grants_to_process])
-        return results
-
-    results = asyncio.run(process_batch())
+    results = asyncio.run(process_new_grants(
+        grants_to_process,
+        "[Core] Starting ingest for {gid} ({slug})...",
+        "[Notify] Failed to send notifications: {error}",
+    ))
     success_count = sum(1 for r in results if r)
     
     return https_fn.Response(json.dumps({
@@ -333,7 +361,6 @@ def scheduled_ingestion(event: scheduler_fn.ScheduledEvent) -> None:
             return
 
     # Fetch from Source API
-    SOURCE_API = "https://oursggrants.gov.sg/api/v1/grant_metadata/explore_grants"
     print(f"[Scheduler] Fetching grants from {SOURCE_API}...", flush=True)
     
     try:
@@ -377,32 +404,11 @@ def scheduled_ingestion(event: scheduler_fn.ScheduledEvent) -> None:
         return
 
     # Process new grants
-    async def process_batch():
-        semaphore = asyncio.Semaphore(10)
-        
-        async def protected_ingest(grant):
-            async with semaphore:
-                slug = grant.get("slug")
-                url = grant.get("url")
-                gid = grant.get("id")
-                
-                if slug and gid:
-                    print(f"[Scheduler] Ingesting {gid} ({slug})...", flush=True)
-                    success = await ingest_grant(gid, slug, url)
-                    
-                    if success:
-                        try:
-                            await send_notifications_for_grant(gid)
-                        except Exception as e:
-                            print(f"[Scheduler] Notification failed: {e}", flush=True)
-                    
-                    return success
-                return False
-
-        results = await asyncio.gather(*[protected_ingest(g) for g in grants_to_process])
-        return results
-
-    results = asyncio.run(process_batch())
+    results = asyncio.run(process_new_grants(
+        grants_to_process,
+        "[Scheduler] Ingesting {gid} ({slug})...",
+        "[Scheduler] Notification failed: {error}",
+    ))
     success_count = sum(1 for r in results if r)
     
     print(f"[Scheduler] Complete. Processed: {len(grants_to_process)}, Succeeded: {success_count}", flush=True)
@@ -1,8 +1,7 @@
-from typing import List, Optional, Dict, Any
+from typing import List, Optional
 from sqlmodel import SQLModel, Field, Column
 from pgvector.sqlalchemy import Vector
 from sqlalchemy.dialects.postgresql import JSONB, TEXT
-import json
 
 class Grant(SQLModel, table=True):
     __tablename__ = "grants"
@@ -20,8 +19,8 @@ class Grant(SQLModel, table=True):
 
     # --- HARD FILTERS (For SQL Checkboxes) ---
     # Fast filtering for: "Show me Sports grants for NPOs"
-    applicant_types: List[str] = Field(sa_column=Column(JSONB), default=[]) # ["NPO", "SME"]
-    sectors: List[str] = Field(sa_column=Column(JSONB), default=[]) # ["Sports", "Arts"]
+    applicant_types: List[str] = Field(sa_column=Column(JSONB), default_factory=list) # ["NPO", "SME"]
+    sectors: List[str] = Field(sa_column=Column(JSONB), default_factory=list) # ["Sports", "Arts"]
     max_funding: Optional[int] = Field(default=None) 
     funding_percentage: Optional[float] = Field(default=None)
     
@@ -32,8 +31,8 @@ class Grant(SQLModel, table=True):
     
     # --- INTELLIGENCE (For Display & Search) ---
     strategic_intent: Optional[str] = Field(sa_column=Column(TEXT), default=None) # "To boost digital adoption..."
-    eligibility_summary: List[str] = Field(sa_column=Column(JSONB), default=[]) # ["Must be IPC", "2 years ops"]
-    kpis: List[str] = Field(sa_column=Column(JSONB), default=[])
+    eligibility_summary: List[str] = Field(sa_column=Column(JSONB), default_factory=list) # ["Must be IPC", "2 years ops"]
+    kpis: List[str] = Field(sa_column=Column(JSONB), default_factory=list)
     
     # --- RAG CONTEXT (The Brain) ---
     # Markdown dump of HTML + PDF + Images
@@ -43,7 +42,7 @@ class Grant(SQLModel, table=True):
     )
     
     # --- ASSETS (For UI Cards) ---
-    image_urls: List[str] = Field(sa_column=Column(JSONB), default=[])
+    image_urls: List[str] = Field(sa_column=Column(JSONB), default_factory=list)
     
     # --- SEARCH INDEX ---
     # 768 dimensions for Gemini text-embedding-004
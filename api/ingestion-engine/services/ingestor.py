@@ -1,12 +1,11 @@
 import os
 import json
 import asyncio
-import base64
 import httpx
-from bs4 import BeautifulSoup, Comment
+from urllib.parse import urljoin
+from bs4 import BeautifulSoup, Comment, SoupStrainer
 from google import genai
 from google.genai.types import GenerateContentConfig, Part
-from sqlmodel import Session
 from database import get_session
 from models import Grant
 
@@ -14,6 +13,38 @@ from models import Grant
 MODEL_ID = "gemini-3-flash-preview"
 EMBEDDING_MODEL_ID = "text-embedding-004"
 
+# Identical for every grant, so validate it once instead of per request/retry
+GENERATE_CONFIG = GenerateContentConfig(response_mime_type="application/json")
+
+# Scraping client configuration
+SCRAPE_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+}
+SCRAPE_TIMEOUT = httpx.Timeout(15.0)
+
+# Page chrome stripped before text extraction
+NON_CONTENT_TAGS = ("script", "style", "nav", "footer", "header", "noscript")
+
+# extract_smart_link only needs <a href=...> tags from guideline_html
+LINK_STRAINER = SoupStrainer("a", href=True)
+
+# Image heuristics (static, shared across every scraped page)
+IMAGE_EXCLUSIONS = ("logo", "icon", "button", "social", "footer", "header")
+IMAGE_PRIORITY_KEYWORDS = ("eligibility", "criteria", "grant", "poster", "flyer", "flowchart", "process")
+# Gemini supported MIME types for vision
+SUPPORTED_IMAGE_MIMES = ("image/png", "image/jpeg", "image/webp", "image/heic", "image/heif")
+# Max concurrent image downloads per page, so one image-heavy page can't starve the shared pool
+IMAGE_FETCH_CONCURRENCY = 4
+
+# Grants ingested concurrently on one shared client (see main.process_new_grants)
+MAX_CONCURRENT_INGESTS = 10
+# Each in-flight grant holds at most IMAGE_FETCH_CONCURRENCY connections at once
+# (details and page requests run before its images), so the pool never makes requests queue
+HTTP_LIMITS = httpx.Limits(
+    max_connections=MAX_CONCURRENT_INGESTS * IMAGE_FETCH_CONCURRENCY,
+    max_keepalive_connections=MAX_CONCURRENT_INGESTS * 2,
+)
+
 # Lazy-initialized client to avoid failures during deployment analysis
 _client = None
 
@@ -23,20 +54,28 @@ def get_genai_client():
         _client = genai.Client(api_key=os.environ.get("GOOGLE_API_KEY"))
     return _client
 
-async def fetch_grant_details(slug: str):
+def create_http_client() -> httpx.AsyncClient:
+    """
+    Creates the HTTP client used for the details API, page scraping and image fetches.
+    Share one across a batch so connections (and TLS sessions) are reused between grants.
+    Browser headers and redirect following are applied per request to scraping only,
+    so details API calls go out exactly as before.
+    """
+    return httpx.AsyncClient(timeout=SCRAPE_TIMEOUT, limits=HTTP_LIMITS)
+
+async def fetch_grant_details(slug: str, http_client: httpx.AsyncClient):
     """
     Fetches the detailed JSON from https://oursggrants.gov.sg/api/v1/grant_instruction/{slug}/...
     """
     api_url = f"https://oursggrants.gov.sg/api/v1/grant_instruction/{slug}/?page_type=instruction&user_type="
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            resp = await client.get(api_url)
-            if resp.status_code == 200:
-                print(f"[Ingest] Fetched details for {slug}")
-                return resp.json()
-            else:
-                print(f"[Ingest] Details API failed: {resp.status_code}")
-                return None
+        resp = await http_client.get(api_url, timeout=10.0)
+        if resp.status_code == 200:
+            print(f"[Ingest] Fetched details for {slug}")
+            return resp.json()
+        else:
+            print(f"[Ingest] Details API failed: {resp.status_code}")
+            return None
     except Exception as e:
         print(f"[Ingest] Details API Error: {e}")
         return None
@@ -55,7 +94,6 @@ def extract_relevant_images(soup, base_url, limit=3):
             
         # Resolve URL first to handle duplicates correctly
         if not src.startswith("http"):
-             from urllib.parse import urljoin
              src = urljoin(base_url, src)
              
         if src in seen_urls:
@@ -67,10 +105,9 @@ def extract_relevant_images(soup, base_url, limit=3):
         class_str = " ".join(img.get("class") or []).lower()
         src_lower = src.lower()
         
-        exclusions = ["logo", "icon", "button", "social", "footer", "header"]
-        if any(x in alt for x in exclusions) or \
-           any(x in class_str for x in exclusions) or \
-           any(x in src_lower for x in exclusions):
+        if any(x in alt for x in IMAGE_EXCLUSIONS) or \
+           any(x in class_str for x in IMAGE_EXCLUSIONS) or \
+           any(x in src_lower for x in IMAGE_EXCLUSIONS):
             continue
 
         # 2. Size Heuristic
@@ -87,8 +124,7 @@ def extract_relevant_images(soup, base_url, limit=3):
         score = width * height
         
         # Boost keywords
-        priority_keywords = ["eligibility", "criteria", "grant", "poster", "flyer", "flowchart", "process"]
-        if any(k in alt for k in priority_keywords):
+        if any(k in alt for k in IMAGE_PRIORITY_KEYWORDS):
             score += 500000 
 
         # Min threshold (approx 150x150)
@@ -101,7 +137,29 @@ def extract_relevant_images(soup, base_url, limit=3):
     # Return top N URLs
     return [x[1] for x in candidates[:limit]]
 
-async def fetch_page_content(url: str):
+async def fetch_image(img_url: str, http_client: httpx.AsyncClient):
+    """
+    Downloads a single image. Returns (image_bytes, mime_type), or None if unusable.
+    """
+    try:
+        # Filter out tiny SVGs or tracking pixels by extension if possible, but mime check is better
+        print(f"[Ingest] Fetching Image: {img_url}")
+        # Stream so the body is only downloaded once status and type are known to be usable
+        async with http_client.stream(
+            "GET", img_url, headers=SCRAPE_HEADERS, follow_redirects=True, timeout=5.0
+        ) as img_resp:
+            if img_resp.status_code == 200:
+                content_type = img_resp.headers.get("Content-Type", "").lower()
+                
+                # Check strict mime type matching or at least containment
+                if any(m in content_type for m in SUPPORTED_IMAGE_MIMES):
+                    return await img_resp.aread(), content_type
+                print(f"[Ingest] Skipped unsupported image type: {content_type} for {img_url}")
+    except Exception as e:
+        print(f"[Ingest] Failed img {img_url}: {e}")
+    return None
+
+async def fetch_page_content(url: str, http_client: httpx.AsyncClient):
     """
     Manually scrapes page text and MULTIPLE relevant images.
     Returns (cleaned_text, List[image_bytes], List[mime_type]).
@@ -110,66 +168,54 @@ async def fetch_page_content(url: str):
         return None, [], []
 
     try:
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-        }
-        async with httpx.AsyncClient(follow_redirects=True, timeout=15.0, headers=headers) as http_client:
-            resp = await http_client.get(url)
-            if resp.status_code >= 400:
-                print(f"[Ingest] Scrape HTTP {resp.status_code} for {url}")
-                if not resp.content:
-                    return None, [], []
-            
-            soup = BeautifulSoup(resp.content, "html.parser")
-            
-            # --- Text Extraction ---
-            for element in soup(["script", "style", "nav", "footer", "header", "noscript"]):
-                element.decompose()
-            comments = soup.find_all(string=lambda text: isinstance(text, Comment))
-            for c in comments: c.extract()
-            text_content = soup.get_text(separator="\n")
-            clean_text = "\n".join([line.strip() for line in text_content.splitlines() if line.strip()])
-            
-            # --- Image Extraction ---
-            image_data_list = []
-            mime_type_list = []
-            
-            # 1. Get Top 10 Body Images
-            target_urls = extract_relevant_images(soup, url, limit=10)
-            
-            # 2. Add OG Image if not present and we have space
-            if len(target_urls) < 10:
-                og_image = soup.find("meta", property="og:image")
-                og_url = og_image.get("content") if og_image else None
-                if og_url:
-                    if not og_url.startswith("http"):
-                        from urllib.parse import urljoin
-                        og_url = urljoin(url, og_url)
-                    if og_url not in target_urls:
-                        target_urls.append(og_url)
-
-            # 3. Fetch Images
-            for img_url in target_urls:
-                try:
-                    # Filter out tiny SVGs or tracking pixels by extension if possible, but mime check is better
-                    print(f"[Ingest] Fetching Image: {img_url}")
-                    img_resp = await http_client.get(img_url, timeout=5.0)
-                    
-                    if img_resp.status_code == 200:
-                        content_type = img_resp.headers.get("Content-Type", "").lower()
-                        # Gemini supported MIME types for vision
-                        supported_mimes = ["image/png", "image/jpeg", "image/webp", "image/heic", "image/heif"]
-                        
-                        # Check strict mime type matching or at least containment
-                        if any(m in content_type for m in supported_mimes):
-                            image_data_list.append(img_resp.content)
-                            mime_type_list.append(content_type)
-                        else:
-                            print(f"[Ingest] Skipped unsupported image type: {content_type} for {img_url}")
-                except Exception as e:
-                    print(f"[Ingest] Failed img {img_url}: {e}")
+        resp = await http_client.get(url, headers=SCRAPE_HEADERS, follow_redirects=True)
+        if resp.status_code >= 400:
+            print(f"[Ingest] Scrape HTTP {resp.status_code} for {url}")
+            if not resp.content:
+                return None, [], []
+        
+        soup = BeautifulSoup(resp.content, "html.parser")
+        
+        # --- Text Extraction ---
+        for element in soup(NON_CONTENT_TAGS):
+            element.decompose()
+        comments = soup.find_all(string=lambda text: isinstance(text, Comment))
+        for c in comments: c.extract()
+        text_content = soup.get_text(separator="\n")
+        # Strip each line once and drop blanks without building an intermediate list
+        clean_text = "\n".join(line for line in map(str.strip, text_content.splitlines()) if line)
+        
+        # --- Image Extraction ---
+        image_data_list = []
+        mime_type_list = []
+        
+        # 1. Get Top 10 Body Images
+        target_urls = extract_relevant_images(soup, url, limit=10)
+        
+        # 2. Add OG Image if not present and we have space
+        if len(target_urls) < 10:
+            og_image = soup.find("meta", property="og:image")
+            og_url = og_image.get("content") if og_image else None
+            if og_url:
+                if not og_url.startswith("http"):
+                    og_url = urljoin(url, og_url)
+                if og_url not in target_urls:
+                    target_urls.append(og_url)
+
+        # 3. Fetch Images (bounded concurrency, keeping target_urls order)
+        image_semaphore = asyncio.Semaphore(IMAGE_FETCH_CONCURRENCY)
 
-            return clean_text, image_data_list, mime_type_list
+        async def bounded_fetch(img_url):
+            async with image_semaphore:
+                return await fetch_image(img_url, http_client)
+
+        fetched = await asyncio.gather(*[bounded_fetch(img_url) for img_url in target_urls])
+        for image in fetched:
+            if image:
+                image_data_list.append(image[0])
+                mime_type_list.append(image[1])
+
+        return clean_text, image_data_list, mime_type_list
 
     except Exception as e:
         print(f"[Ingest] Scrape Error for {url}: {e}")
@@ -186,7 +232,8 @@ def extract_smart_link(details_json):
     if not html_content:
         return None
         
-    soup = BeautifulSoup(html_content, "html.parser")
+    # Only anchors matter here, so skip building the rest of the tree
+    soup = BeautifulSoup(html_content, "html.parser", parse_only=LINK_STRAINER)
     for a in soup.find_all("a", href=True):
         href = a["href"]
         # Filter for logic
@@ -214,12 +261,16 @@ def determine_is_open(details):
     # If we have keys but none say open, assume closed
     return False
 
-async def ingest_grant(grant_id: str, slug: str, external_url: str = None):
+async def ingest_grant(grant_id: str, slug: str, external_url: str = None, http_client: httpx.AsyncClient = None):
+    if http_client is None:
+        async with create_http_client() as http_client:
+            return await ingest_grant(grant_id, slug, external_url, http_client)
+
     print(f"[Ingest] Starting {grant_id} ({slug}) - via Details API + Smart Scraping")
 
     try:
         # 1. Fetch Details API
-        details = await fetch_grant_details(slug) or {}
+        details = await fetch_grant_details(slug, http_client) or {}
         
         # 2. Smart Link Extraction
         # Priority: 
@@ -239,7 +290,7 @@ async def ingest_grant(grant_id: str, slug: str, external_url: str = None):
         
         if target_url:
             print(f"[Ingest] Scraping Target: {target_url}")
-            scraped_text, images_data, images_mimes = await fetch_page_content(target_url)
+            scraped_text, images_data, images_mimes = await fetch_page_content(target_url, http_client)
 
         # 3. Construct Context
         # Construct the "Application URL" as requested
@@ -304,7 +355,8 @@ async def ingest_grant(grant_id: str, slug: str, external_url: str = None):
             for i, img_bytes in enumerate(images_data):
                 try:
                     mime = images_mimes[i]
-                    parts.append(Part(inline_data={"mime_type": mime, "data": base64.b64encode(img_bytes).decode("utf-8")}))
+                    # Pass raw bytes; the SDK base64-encodes once when serializing the request
+                    parts.append(Part.from_bytes(data=img_bytes, mime_type=mime))
                 except Exception as e:
                     print(f"[Ingest] Could not attach image {i}: {e}")
 
@@ -315,17 +367,16 @@ async def ingest_grant(grant_id: str, slug: str, external_url: str = None):
                 response = await get_genai_client().aio.models.generate_content(
                     model=MODEL_ID,
                     contents=parts,
-                    config=GenerateContentConfig(
-                        response_mime_type="application/json"
-                    )
+                    config=GENERATE_CONFIG
                 )
                 break # Success
             except Exception as e:
-                if "429" in str(e) or "Resource" in str(e):
+                error_text = str(e)
+                if "429" in error_text or "Resource" in error_text:
+                    if attempt == 2: raise e # Fail after 3 tries (no point sleeping first)
                     wait_time = (2 ** attempt) * 2 # 2s, 4s
                     print(f"[Ingest] Rate Limit (429) for {slug}. Retrying in {wait_time}s...")
                     await asyncio.sleep(wait_time)
-                    if attempt == 2: raise e # Fail after 3 tries
                 else:
                     raise e # Other errors fail immediately
 